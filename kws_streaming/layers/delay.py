@@ -41,20 +41,44 @@ class Delay(tf.keras.layers.Layer):
     self.mode = mode
     self.delay = delay
     self.inference_batch_size = inference_batch_size
+    self._call_impl = None
+    self._call_impl_mode = None
 
   def build(self, input_shape):
     super(Delay, self).build(input_shape)
 
+    # cache the frame size in time dim: it is static after build,
+    # so there is no need to walk inputs.shape on every call
+    self.frame_size = input_shape.as_list()[1]
+
+    # pre-baked gather indices of the delayed output and of the retained
+    # state rows: gather with constant indices fuses with the surrounding
+    # scatter/concat under XLA better than strided slices
+    self._output_indices = None
+    self._shift_indices = None
+    if (self.delay > 0 and self.frame_size is not None and
+        self.frame_size <= self.delay and
+        self.mode in (modes.Modes.STREAM_INTERNAL_STATE_INFERENCE,
+                      modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE)):
+      self._output_indices = tf.constant(
+          list(range(self.frame_size)), dtype=tf.int32)
+      self._shift_indices = tf.constant(
+          list(range(self.frame_size, self.delay)), dtype=tf.int32)
+
     if self.delay > 0:
       if self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
         self.state_shape = [
             self.inference_batch_size, self.delay
         ] + input_shape.as_list()[2:]
+        # state is updated by one replica during inference only,
+        # so no cross replica synchronization/aggregation logic is needed
         self.states = self.add_weight(
             name='states',
             shape=self.state_shape,
             trainable=False,
-            initializer=tf.zeros_initializer)
+            initializer=tf.zeros_initializer,
+            synchronization=tf.VariableSynchronization.NONE,
+            aggregation=tf.VariableAggregation.NONE)
 
       elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
         # For streaming inference with extrnal states,
@@ -65,26 +89,39 @@ class Delay(tf.keras.layers.Layer):
             name=self.name + '/input_state_delay')
         self.output_state = None
 
-  def call(self, inputs):
-    if self.delay == 0:
-      return inputs
+    # resolve mode dispatch once at build time,
+    # so it is not re-evaluated on every call
+    self._bind_call_impl()
 
-    if self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
-      return self._streaming_internal_state(inputs)
+  def _external_state_call(self, inputs):
+    # in streaming inference mode with external state
+    # in addition to the output we return the output state.
+    output, self.output_state = self._streaming_external_state(
+        inputs, self.input_state)
+    return output
 
+  def _bind_call_impl(self):
+    """Binds call() implementation based on the current mode."""
+    if self.delay == 0:
+      # with no delay the layer is a pass through in all modes
+      self._call_impl = self._non_streaming
+    elif self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
+      self._call_impl = self._streaming_internal_state
     elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
-      # in streaming inference mode with external state
-      # in addition to the output we return the output state.
-      output, self.output_state = self._streaming_external_state(
-          inputs, self.input_state)
-      return output
-
+      self._call_impl = self._external_state_call
     elif self.mode in (modes.Modes.TRAINING, modes.Modes.NON_STREAM_INFERENCE):
       # run non streamable training or non streamable inference
-      return self._non_streaming(inputs)
-
+      self._call_impl = self._non_streaming
     else:
       raise ValueError(f'Encountered unexpected mode `{self.mode}`.')
+    self._call_impl_mode = self.mode
+
+  def call(self, inputs):
+    if self._call_impl is None or self._call_impl_mode != self.mode:
+      # mode can be reassigned after the layer was built
+      # (see utils._set_mode), in that case dispatch is resolved again
+      self._bind_call_impl()
+    return self._call_impl(inputs)
 
   def get_config(self):
     config = super(Delay, self).get_config()
@@ -96,18 +133,47 @@ class Delay(tf.keras.layers.Layer):
     return config
 
   def _streaming_internal_state(self, inputs):
-    memory = tf.keras.backend.concatenate([self.states, inputs], 1)
-    outputs = memory[:, 0:inputs.shape.as_list()[1], :]
-    new_memory = memory[:, -self.delay:, :]
-    assign_states = self.states.assign(new_memory)
+    time_size = self.frame_size
+    if time_size <= self.delay:
+      # The first time_size rows of the state are delayed out,
+      # remaining state rows are shifted and inputs appended,
+      # so there is no need to concatenate the full state with inputs.
+      # Read the state once, so that outputs and new_memory are computed
+      # from the same snapshot of the state variable.
+      states = self.states.read_value()
+      if self._output_indices is not None:
+        outputs = tf.gather(states, self._output_indices, axis=1)
+        retained = tf.gather(states, self._shift_indices, axis=1)
+      else:
+        outputs = states[:, 0:time_size, :]
+        retained = states[:, time_size:, :]
+      new_memory = tf.keras.backend.concatenate([retained, inputs], 1)
+    else:
+      # Streamed frame is longer than the delay: part of inputs goes
+      # directly to outputs and the state is the tail of inputs.
+      memory = tf.keras.backend.concatenate([self.states, inputs], 1)
+      outputs = memory[:, 0:time_size, :]
+      new_memory = memory[:, -self.delay:, :]
+    # the assigned value is not consumed, so do not emit a read of it
+    assign_states = self.states.assign(new_memory, read_value=False)
 
     with tf.control_dependencies([assign_states]):
       return tf.identity(outputs)
 
   def _streaming_external_state(self, inputs, states):
-    memory = tf.keras.backend.concatenate([states, inputs], 1)
-    outputs = memory[:, 0:inputs.shape.as_list()[1], :]
-    new_memory = memory[:, -self.delay:, :]
+    time_size = self.frame_size
+    if time_size <= self.delay:
+      if self._output_indices is not None:
+        outputs = tf.gather(states, self._output_indices, axis=1)
+        retained = tf.gather(states, self._shift_indices, axis=1)
+      else:
+        outputs = states[:, 0:time_size, :]
+        retained = states[:, time_size:, :]
+      new_memory = tf.keras.backend.concatenate([retained, inputs], 1)
+    else:
+      memory = tf.keras.backend.concatenate([states, inputs], 1)
+      outputs = memory[:, 0:time_size, :]
+      new_memory = memory[:, -self.delay:, :]
     return outputs, new_memory
 
   def _non_streaming(self, inputs):
@@ -15,6 +15,8 @@
 
 """Modes the model can be in and its input data shape."""
 
+import functools
+
 
 class Modes(object):
   """Definition of the mode the model is functioning in."""
@@ -37,6 +39,35 @@ class Modes(object):
   NON_STREAM_INFERENCE = 'NON_STREAM_INFERENCE'
 
 
+@functools.lru_cache(maxsize=None)
+def _input_data_shape_cached(preprocess, mode, data_shape, desired_samples,
+                             window_stride_samples, spectrogram_length,
+                             dct_num_features, mel_num_bins):
+  """Computes input data shape from the relevant flag fields."""
+  if preprocess == 'custom':
+    # it is a special case to customize input data shape
+    # and use model on its own (for debugging only)
+    pass
+  elif preprocess == 'raw':
+    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
+      data_shape = (desired_samples,)
+    else:
+      data_shape = (window_stride_samples,)  # streaming
+  elif preprocess == 'mfcc':
+    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
+      data_shape = (spectrogram_length, dct_num_features,)
+    else:
+      data_shape = (1, dct_num_features,)  # streaming
+  elif preprocess == 'micro':
+    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
+      data_shape = (spectrogram_length, mel_num_bins,)
+    else:
+      data_shape = (1, mel_num_bins,)  # streaming
+  else:
+    raise ValueError('Unknown preprocess mode "%s"' % preprocess)
+  return data_shape
+
+
 def get_input_data_shape(flags, mode):
   """Gets data shape for a neural net input layer.
 
@@ -51,27 +82,17 @@ def get_input_data_shape(flags, mode):
   if mode not in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE,
                   Modes.STREAM_INTERNAL_STATE_INFERENCE,
                   Modes.STREAM_EXTERNAL_STATE_INFERENCE):
-    raise ValueError('Unknown mode "%s" ' % flags.mode)
+    raise ValueError('Unknown mode "%s" ' % mode)
 
-  if flags.preprocess == 'custom':
-    # it is a special case to customize input data shape
-    # and use model on its own (for debugging only)
-    data_shape = flags.data_shape
-  elif flags.preprocess == 'raw':
-    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
-      data_shape = (flags.desired_samples,)
-    else:
-      data_shape = (flags.window_stride_samples,)  # streaming
-  elif flags.preprocess == 'mfcc':
-    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
-      data_shape = (flags.spectrogram_length, flags.dct_num_features,)
-    else:
-      data_shape = (1, flags.dct_num_features,)  # streaming
-  elif flags.preprocess == 'micro':
-    if mode in (Modes.TRAINING, Modes.NON_STREAM_INFERENCE):
-      data_shape = (flags.spectrogram_length, flags.mel_num_bins,)
-    else:
-      data_shape = (1, flags.mel_num_bins,)  # streaming
-  else:
-    raise ValueError('Unknown preprocess mode "%s"' % flags.preprocess)
-  return data_shape
+  # the same flags are used for many model builds during sweeps, so the
+  # shape computation is memoized on the relevant flag fields
+  data_shape = getattr(flags, 'data_shape', None)
+  if isinstance(data_shape, list):
+    data_shape = tuple(data_shape)
+  return _input_data_shape_cached(
+      flags.preprocess, mode, data_shape,
+      getattr(flags, 'desired_samples', None),
+      getattr(flags, 'window_stride_samples', None),
+      getattr(flags, 'spectrogram_length', None),
+      getattr(flags, 'dct_num_features', None),
+      getattr(flags, 'mel_num_bins', None))
@@ -54,6 +54,10 @@ class Stream(tf.keras.layers.Layer):
     use_one_step: True - model will run one sample per one inference step;
       False - model will run multiple per one inference step.
       It is useful for strided streaming
+    state_dtype: dtype of the ring buffer state, by default the layer dtype
+      is used; a reduced precision dtype (for example tf.bfloat16) halves
+      the state buffer traffic per streaming step, the new frame is cast
+      into it and the buffered window is cast back before the cell
     **kwargs: additional layer arguments
 
   Raises:
@@ -70,6 +74,7 @@ class Stream(tf.keras.layers.Layer):
                state_shape=None,
                ring_buffer_size_in_time_dim=None,
                use_one_step=True,
+               state_dtype=None,
                **kwargs):
     super(Stream, self).__init__(**kwargs)
 
@@ -80,6 +85,9 @@ class Stream(tf.keras.layers.Layer):
     self.state_shape = state_shape
     self.ring_buffer_size_in_time_dim = ring_buffer_size_in_time_dim
     self.use_one_step = use_one_step
+    self.state_dtype = state_dtype
+    self._call_impl = None
+    self._call_impl_mode = None
 
     if not use_one_step and isinstance(
         self.cell, (tf.keras.layers.Flatten, tf.keras.layers.GlobalMaxPooling2D,
@@ -101,10 +109,14 @@ class Stream(tf.keras.layers.Layer):
                tf.keras.layers.DepthwiseConv2D, tf.keras.layers.SeparableConv2D,
                tf.keras.layers.SeparableConv1D)):
 
+      # serialize the cell config once: every get_config() call rebuilds
+      # the full config dict
+      cell_config = cell.get_config()
+
       if self.mode not in (modes.Modes.TRAINING,
                            modes.Modes.NON_STREAM_INFERENCE):
-        padding = cell.get_config()['padding']
-        strides = cell.get_config()['strides']
+        padding = cell_config['padding']
+        strides = cell_config['strides']
         if padding != 'valid':
           raise ValueError('conv/cell padding has to be valid,'
                            'padding has to be set by pad_time_dim')
@@ -115,8 +127,8 @@ class Stream(tf.keras.layers.Layer):
                              'in streaming mode with use_one_step=True'
                              ' is not supported, set use_one_step=False')
 
-      dilation_rate = cell.get_config()['dilation_rate']
-      kernel_size = cell.get_config()['kernel_size']
+      dilation_rate = cell_config['dilation_rate']
+      kernel_size = cell_config['kernel_size']
       if self.use_one_step:
         # effective kernel size in time dimension
         self.ring_buffer_size_in_time_dim = dilation_rate[0] * (kernel_size[0] -
@@ -127,8 +139,9 @@ class Stream(tf.keras.layers.Layer):
             kernel_size[0] - 1)
 
     elif isinstance(self.cell, tf.keras.layers.AveragePooling2D):
-      strides = cell.get_config()['strides']
-      pool_size = cell.get_config()['pool_size']
+      cell_config = cell.get_config()
+      strides = cell_config['strides']
+      pool_size = cell_config['pool_size']
       if self.mode not in (
           modes.Modes.TRAINING,
           modes.Modes.NON_STREAM_INFERENCE) and strides[0] != pool_size[0]:
@@ -187,11 +200,28 @@ class Stream(tf.keras.layers.Layer):
       # Create a state varaible for streaming inference mode (internal state).
       # Where states become a weight in the layer
       if self.ring_buffer_size_in_time_dim:
+        # state is updated by one replica during inference only,
+        # so no cross replica synchronization/aggregation logic is needed
         self.states = self.add_weight(
             name='states',
             shape=self.state_shape,
+            dtype=self.state_dtype,
             trainable=False,
-            initializer=tf.zeros_initializer)
+            initializer=tf.zeros_initializer,
+            synchronization=tf.VariableSynchronization.NONE,
+            aggregation=tf.VariableAggregation.NONE)
+        if self.use_one_step:
+          # ring buffer write position: the new frame is written over the
+          # oldest row pointed to by this index, so no state rows are
+          # shifted on a streaming step
+          self.write_index = self.add_weight(
+              name='write_index',
+              shape=[],
+              dtype=tf.int32,
+              trainable=False,
+              initializer=tf.zeros_initializer,
+              synchronization=tf.VariableSynchronization.NONE,
+              aggregation=tf.VariableAggregation.NONE)
 
     elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
       # For streaming inference with extrnal states,
@@ -200,28 +230,59 @@ class Stream(tf.keras.layers.Layer):
         self.input_state = tf.keras.layers.Input(
             shape=self.state_shape[1:],
             batch_size=self.inference_batch_size,
+            dtype=self.state_dtype,
             name=self.name + '/input_state')  # adding names to make it unique
       else:
         self.input_state = None
       self.output_state = None
 
-  def call(self, inputs):
+    # pre-baked gather indices of the state update rows for the multi step
+    # streaming path: gather with constant indices fuses with the
+    # surrounding concat under XLA better than a strided slice
+    self._state_update_indices = None
+    if (not self.use_one_step and self.ring_buffer_size_in_time_dim and
+        self.mode in (modes.Modes.STREAM_INTERNAL_STATE_INFERENCE,
+                      modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE)):
+      input_frames = input_shape.as_list()[1]
+      if input_frames is not None:
+        # memory rows are [state; inputs], its last
+        # ring_buffer_size_in_time_dim rows become the new state
+        self._state_update_indices = tf.constant(
+            list(
+                range(input_frames,
+                      input_frames + self.ring_buffer_size_in_time_dim)),
+            dtype=tf.int32)
+
+    # resolve mode dispatch once at build time,
+    # so it is not re-evaluated on every call
+    self._bind_call_impl()
+
+  def _external_state_call(self, inputs):
+    # in streaming inference mode with external state
+    # in addition to the output we return the output state.
+    output, self.output_state = self._streaming_external_state(
+        inputs, self.input_state)
+    return output
+
+  def _bind_call_impl(self):
+    """Binds call() implementation based on the current mode."""
     if self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
-      return self._streaming_internal_state(inputs)
-
+      self._call_impl = self._streaming_internal_state
     elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
-      # in streaming inference mode with external state
-      # in addition to the output we return the output state.
-      output, self.output_state = self._streaming_external_state(
-          inputs, self.input_state)
-      return output
-
+      self._call_impl = self._external_state_call
     elif self.mode in (modes.Modes.TRAINING, modes.Modes.NON_STREAM_INFERENCE):
       # run non streamable training or non streamable inference
-      return self._non_streaming(inputs)
-
+      self._call_impl = self._non_streaming
     else:
       raise ValueError(f'Encountered unexpected mode `{self.mode}`.')
+    self._call_impl_mode = self.mode
+
+  def call(self, inputs):
+    if self._call_impl is None or self._call_impl_mode != self.mode:
+      # mode can be reassigned after the layer was built
+      # (see utils._set_mode), in that case dispatch is resolved again
+      self._bind_call_impl()
+    return self._call_impl(inputs)
 
   def get_config(self):
     config = super(Stream, self).get_config()
@@ -233,6 +294,7 @@ class Stream(tf.keras.layers.Layer):
         'state_shape': self.state_shape,
         'ring_buffer_size_in_time_dim': self.ring_buffer_size_in_time_dim,
         'use_one_step': self.use_one_step,
+        'state_dtype': self.state_dtype,
     })
     return config
 
@@ -252,59 +314,98 @@ class Stream(tf.keras.layers.Layer):
       raise ValueError('Expected the layer to be in external streaming mode, '
                        f'not `{self.mode}`.')
 
+  def _newest_row_indices(self):
+    # scatter indices of the newest ring buffer row, one per batch element:
+    # [[0, memory_size-1], [1, memory_size-1], ...]
+    return tf.constant([[batch, self.ring_buffer_size_in_time_dim - 1]
+                        for batch in range(self.inference_batch_size)])
+
   def _streaming_internal_state(self, inputs):
+    cell_dtype = inputs.dtype
+    if self.ring_buffer_size_in_time_dim and self.states.dtype != cell_dtype:
+      # state is kept in a reduced precision dtype: cast the new frame in,
+      # the buffered window is cast back before the cell
+      inputs = tf.cast(inputs, self.states.dtype)
     if self.use_one_step:
       # The time dimenstion always has to equal 1 in streaming mode.
       if inputs.shape[1] != 1:
         raise ValueError('inputs.shape[1]: %d must be 1 ' % inputs.shape[1])
 
-      # remove latest row [batch_size, (memory_size-1), feature_dim, channel]
-      memory = self.states[:, 1:self.ring_buffer_size_in_time_dim, :]
-
-      # add new row [batch_size, memory_size, feature_dim, channel]
-      memory = tf.keras.backend.concatenate([memory, inputs], 1)
-
-      assign_states = self.states.assign(memory)
-
-      with tf.control_dependencies([assign_states]):
-        return self.cell(memory)
+      # write the new frame in place over the oldest row of the state
+      # variable, pointed to by write_index: only one row of data moves
+      # per streaming step and no rows are shifted;
+      # feeding the scatter result to the cell makes the cell read from the
+      # pre-allocated state buffer and guarantees the state is updated
+      # before the cell runs
+      index = self.write_index.read_value()
+      write_indices = tf.stack([
+          tf.range(self.inference_batch_size),
+          tf.fill([self.inference_batch_size], index)
+      ],
+                               axis=1)
+      memory = self.states.scatter_nd_update(write_indices, inputs[:, 0])
+
+      # gather the rows in oldest to newest order for the cell: after the
+      # write the oldest row is the one after the write position
+      ordered_indices = (
+          index + 1 + tf.range(self.ring_buffer_size_in_time_dim)
+      ) % self.ring_buffer_size_in_time_dim
+      memory = tf.gather(memory, ordered_indices, axis=1)
+
+      assign_index = self.write_index.assign(
+          (index + 1) % self.ring_buffer_size_in_time_dim, read_value=False)
+      with tf.control_dependencies([assign_index]):
+        memory = tf.identity(memory)
+      return self.cell(tf.cast(memory, cell_dtype))
     else:
       # add new row [batch_size, memory_size, feature_dim, channel]
       if self.ring_buffer_size_in_time_dim:
         memory = tf.keras.backend.concatenate([self.states, inputs], 1)
 
-        state_update = memory[:, -self.ring_buffer_size_in_time_dim:, :]  # pylint: disable=invalid-unary-operand-type
+        if self._state_update_indices is not None:
+          state_update = tf.gather(memory, self._state_update_indices, axis=1)
+        else:
+          state_update = memory[:, -self.ring_buffer_size_in_time_dim:, :]  # pylint: disable=invalid-unary-operand-type
 
-        assign_states = self.states.assign(state_update)
+        # the assigned value is not consumed, so do not emit a read of it
+        assign_states = self.states.assign(state_update, read_value=False)
 
         with tf.control_dependencies([assign_states]):
-          return self.cell(memory)
+          return self.cell(tf.cast(memory, cell_dtype))
       else:
         return inputs
 
   def _streaming_external_state(self, inputs, state):
     state = [] if state is None else state
+    cell_dtype = inputs.dtype
+    if self.ring_buffer_size_in_time_dim and state.dtype != cell_dtype:
+      # state is kept in a reduced precision dtype: cast the new frame in,
+      # the buffered window is cast back before the cell
+      inputs = tf.cast(inputs, state.dtype)
     if self.use_one_step:
       # The time dimenstion always has to equal 1 in streaming mode.
       if inputs.shape[1] != 1:
         raise ValueError('inputs.shape[1]: %d must be 1 ' % inputs.shape[1])
 
-      # remove latest row [batch_size, (memory_size-1), feature_dim, channel]
-      memory = state[:, 1:self.ring_buffer_size_in_time_dim, :]
+      # rotate the ring buffer by one row and overwrite the last row
+      # with the new frame [batch_size, memory_size, feature_dim, channel]
+      memory = tf.roll(state, shift=-1, axis=1)
+      memory = tf.tensor_scatter_nd_update(memory, self._newest_row_indices(),
+                                           inputs[:, 0])
 
-      # add new row [batch_size, memory_size, feature_dim, channel]
-      memory = tf.keras.backend.concatenate([memory, inputs], 1)
-
-      output = self.cell(memory)
+      output = self.cell(tf.cast(memory, cell_dtype))
       return output, memory
     else:
       # add new row [batch_size, memory_size, feature_dim, channel]
       if self.ring_buffer_size_in_time_dim:
         memory = tf.keras.backend.concatenate([state, inputs], 1)
 
-        state_update = memory[:, -self.ring_buffer_size_in_time_dim:, :]  # pylint: disable=invalid-unary-operand-type
+        if self._state_update_indices is not None:
+          state_update = tf.gather(memory, self._state_update_indices, axis=1)
+        else:
+          state_update = memory[:, -self.ring_buffer_size_in_time_dim:, :]  # pylint: disable=invalid-unary-operand-type
 
-        output = self.cell(memory)
+        output = self.cell(tf.cast(memory, cell_dtype))
         return output, state_update
       else:
         return inputs, []
@@ -328,6 +429,24 @@ class Stream(tf.keras.layers.Layer):
       elif self.pad_time_dim == 'same':
         half = self.ring_buffer_size_in_time_dim // 2
         pad[1] = [half, half]
-      inputs = tf.pad(inputs, pad, 'constant')
+
+      if inputs.shape.is_fully_defined():
+        # concatenate with constant zero blocks instead of tf.pad: the
+        # blocks are graph constants materialized once, so the padded
+        # buffer is not zero filled from scratch on every training step,
+        # inputs are written after/between the reused constants
+        dims = inputs.shape.as_list()
+        blocks = []
+        if pad[1][0]:
+          blocks.append(
+              tf.zeros([dims[0], pad[1][0]] + dims[2:], dtype=inputs.dtype))
+        blocks.append(inputs)
+        if pad[1][1]:
+          blocks.append(
+              tf.zeros([dims[0], pad[1][1]] + dims[2:], dtype=inputs.dtype))
+        if len(blocks) > 1:
+          inputs = tf.concat(blocks, axis=1)
+      else:
+        inputs = tf.pad(inputs, pad, 'constant')
 
     return self.cell(inputs)
@@ -0,0 +1,271 @@
+# coding=utf-8
+# Copyright 2020 The Google Research Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Conv2D layer with incremental im2col for streaming inference."""
+
+from kws_streaming.layers import modes
+from kws_streaming.layers.compat import tf
+
+
+class StreamingConv2D(tf.keras.layers.Layer):
+  """Conv2D with streaming inference over a patch ring buffer.
+
+  It is a drop in replacement of Stream(cell=Conv2D(...)) for the
+  one step streaming case with strides (1, 1).
+  Stream() keeps raw input frames in its ring buffer, so on every streaming
+  step the wrapped Conv2D re-extracts convolution patches from all
+  buffered frames even though only one frame is new.
+  This layer instead buffers the already extracted patches:
+  on every step it computes the patches of the new frame only,
+  writes them into the ring buffer and runs the convolution as one matmul
+  of the buffered patch matrix with the reshaped kernel.
+  Per step patch extraction cost drops from
+  O(memory_size * feature * channels) to O(feature * channels).
+
+  In training and non streaming inference modes it computes a standard
+  convolution with optional temporal padding, as Stream() does.
+
+  Attributes:
+    filters: number of output filters
+    kernel_size: 2D kernel size in (time, feature) dims
+    dilation_rate: dilation in (time, feature) dims,
+      only feature dilation 1 is supported
+    activation: activation function applied to the convolution output
+    use_bias: if True bias will be added
+    mode: Training or inference modes: non streaming, streaming
+    inference_batch_size: batch size in inference mode
+    pad_time_dim: padding in time applied in non streaming modes:
+      None, 'causal' or 'same'
+    kernel_initializer: initializer of the convolution kernel
+    bias_initializer: initializer of the bias
+    **kwargs: additional layer arguments
+
+  Raises:
+    ValueError: if dilation in feature dim is not 1
+  """
+
+  def __init__(self,
+               filters,
+               kernel_size=(3, 3),
+               dilation_rate=(1, 1),
+               activation='linear',
+               use_bias=True,
+               mode=modes.Modes.TRAINING,
+               inference_batch_size=1,
+               pad_time_dim=None,
+               kernel_initializer='glorot_uniform',
+               bias_initializer='zeros',
+               **kwargs):
+    super(StreamingConv2D, self).__init__(**kwargs)
+    self.filters = filters
+    self.kernel_size = kernel_size
+    self.dilation_rate = dilation_rate
+    self.activation = activation
+    self.use_bias = use_bias
+    self.mode = mode
+    self.inference_batch_size = inference_batch_size
+    self.pad_time_dim = pad_time_dim
+    self.kernel_initializer = kernel_initializer
+    self.bias_initializer = bias_initializer
+
+    if dilation_rate[1] != 1:
+      raise ValueError('dilation_rate in feature dim %d must be 1' %
+                       dilation_rate[1])
+
+    self.activation_fn = tf.keras.activations.get(activation)
+
+    # effective kernel size in time dimension
+    self.ring_buffer_size_in_time_dim = dilation_rate[0] * (kernel_size[0] -
+                                                            1) + 1
+
+  def build(self, input_shape):
+    super(StreamingConv2D, self).build(input_shape)
+    # input_shape is [batch, time, feature, channels]
+    feature_size = input_shape.as_list()[2]
+    channels = input_shape.as_list()[3]
+
+    self.kernel = self.add_weight(
+        name='kernel',
+        shape=self.kernel_size + (channels, self.filters),
+        initializer=self.kernel_initializer)
+    if self.use_bias:
+      self.bias = self.add_weight(
+          name='bias', shape=(self.filters,),
+          initializer=self.bias_initializer)
+
+    # every ring buffer row keeps the extracted patches of one input frame
+    # with dims [patch_positions_in_feature_dim, kernel_feature_size*channels]
+    patch_positions = feature_size - self.kernel_size[1] + 1
+    self.state_shape = [
+        self.inference_batch_size, self.ring_buffer_size_in_time_dim,
+        patch_positions, self.kernel_size[1] * channels
+    ]
+
+    if self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
+      # state is updated by one replica during inference only,
+      # so no cross replica synchronization/aggregation logic is needed
+      self.states = self.add_weight(
+          name='states',
+          shape=self.state_shape,
+          trainable=False,
+          initializer=tf.zeros_initializer,
+          synchronization=tf.VariableSynchronization.NONE,
+          aggregation=tf.VariableAggregation.NONE)
+    elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
+      # For streaming inference with extrnal states,
+      # the states are passed in as input.
+      self.input_state = tf.keras.layers.Input(
+          shape=self.state_shape[1:],
+          batch_size=self.inference_batch_size,
+          name=self.name + '/input_state_patches')
+      self.output_state = None
+
+  def call(self, inputs):
+    if inputs.shape.rank != 4:  # [batch, time, feature, channels]
+      raise ValueError('inputs.shape.rank: %d must be 4' % inputs.shape.rank)
+
+    if self.mode == modes.Modes.STREAM_INTERNAL_STATE_INFERENCE:
+      return self._streaming_internal_state(inputs)
+    elif self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
+      # in streaming inference mode with external state
+      # in addition to the output we return the output state.
+      output, self.output_state = self._streaming_external_state(
+          inputs, self.input_state)
+      return output
+    elif self.mode in (modes.Modes.TRAINING, modes.Modes.NON_STREAM_INFERENCE):
+      # run non streamable training or non streamable inference
+      return self._non_streaming(inputs)
+    else:
+      raise ValueError(f'Encountered unexpected mode `{self.mode}`.')
+
+  def get_config(self):
+    config = {
+        'filters': self.filters,
+        'kernel_size': self.kernel_size,
+        'dilation_rate': self.dilation_rate,
+        'activation': self.activation,
+        'use_bias': self.use_bias,
+        'mode': self.mode,
+        'inference_batch_size': self.inference_batch_size,
+        'pad_time_dim': self.pad_time_dim,
+        'kernel_initializer': self.kernel_initializer,
+        'bias_initializer': self.bias_initializer,
+    }
+    base_config = super(StreamingConv2D, self).get_config()
+    return dict(list(base_config.items()) + list(config.items()))
+
+  def get_input_state(self):
+    # input state will be used only for STREAM_EXTERNAL_STATE_INFERENCE mode
+    if self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
+      return [self.input_state]
+    else:
+      raise ValueError('Expected the layer to be in external streaming mode, '
+                       f'not `{self.mode}`.')
+
+  def get_output_state(self):
+    # output state will be used only for STREAM_EXTERNAL_STATE_INFERENCE mode
+    if self.mode == modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE:
+      return [self.output_state]
+    else:
+      raise ValueError('Expected the layer to be in external streaming mode, '
+                       f'not `{self.mode}`.')
+
+  def _frame_patches(self, inputs):
+    # extract convolution patches of one input frame [batch, 1, feature,
+    # channels] in feature dim, returns [batch, 1, patch_positions,
+    # kernel_feature_size*channels]
+    return tf.image.extract_patches(
+        inputs,
+        sizes=[1, 1, self.kernel_size[1], 1],
+        strides=[1, 1, 1, 1],
+        rates=[1, 1, 1, 1],
+        padding='VALID')
+
+  def _newest_row_indices(self):
+    # scatter indices of the newest ring buffer row, one per batch element
+    return tf.constant([[batch, self.ring_buffer_size_in_time_dim - 1]
+                        for batch in range(self.inference_batch_size)])
+
+  def _conv_from_patches(self, memory):
+    # gather the dilated time taps of the kernel from the patch ring buffer
+    # [batch, kernel_time_size, patch_positions, kernel_feature_size*channels]
+    taps = list(
+        range(0, self.ring_buffer_size_in_time_dim, self.dilation_rate[0]))
+    window = tf.gather(memory, taps, axis=1)
+
+    # [batch, patch_positions, kernel_time_size*kernel_feature_size*channels]
+    window = tf.transpose(window, [0, 2, 1, 3])
+    window = tf.reshape(
+        window,
+        [self.inference_batch_size, self.state_shape[2], -1])
+
+    # single matmul against the reshaped kernel replaces the Conv2D kernel
+    # [batch, patch_positions, filters]
+    kernel = tf.reshape(self.kernel, [-1, self.filters])
+    outputs = tf.tensordot(window, kernel, axes=[[2], [0]])
+
+    if self.use_bias:
+      outputs = outputs + self.bias
+    outputs = self.activation_fn(outputs)
+
+    # [batch, 1, patch_positions, filters]
+    return tf.keras.backend.expand_dims(outputs, axis=1)
+
+  def _streaming_internal_state(self, inputs):
+    # The time dimenstion always has to equal 1 in streaming mode.
+    if inputs.shape[1] != 1:
+      raise ValueError('inputs.shape[1]: %d must be 1 ' % inputs.shape[1])
+
+    # extract patches of the new frame only, rotate the patch ring buffer
+    # in place and write the new patches into the newest row
+    new_patches = self._frame_patches(inputs)
+    assign_rolled = self.states.assign(
+        tf.roll(self.states, shift=-1, axis=1))
+    with tf.control_dependencies([assign_rolled]):
+      memory = self.states.scatter_nd_update(self._newest_row_indices(),
+                                             new_patches[:, 0])
+    return self._conv_from_patches(memory)
+
+  def _streaming_external_state(self, inputs, state):
+    # The time dimenstion always has to equal 1 in streaming mode.
+    if inputs.shape[1] != 1:
+      raise ValueError('inputs.shape[1]: %d must be 1 ' % inputs.shape[1])
+
+    new_patches = self._frame_patches(inputs)
+    memory = tf.roll(state, shift=-1, axis=1)
+    memory = tf.tensor_scatter_nd_update(memory, self._newest_row_indices(),
+                                         new_patches[:, 0])
+    return self._conv_from_patches(memory), memory
+
+  def _non_streaming(self, inputs):
+    # Pad inputs in time dim: causal or same
+    if self.pad_time_dim:
+      pad = [[0, 0]] * inputs.shape.rank
+      if self.pad_time_dim == 'causal':
+        pad[1] = [self.ring_buffer_size_in_time_dim - 1, 0]
+      elif self.pad_time_dim == 'same':
+        half = self.ring_buffer_size_in_time_dim // 2
+        pad[1] = [half, half]
+      inputs = tf.pad(inputs, pad, 'constant')
+
+    outputs = tf.nn.conv2d(
+        inputs,
+        self.kernel,
+        strides=[1, 1, 1, 1],
+        padding='VALID',
+        dilations=[1, self.dilation_rate[0], self.dilation_rate[1], 1])
+    if self.use_bias:
+      outputs = outputs + self.bias
+    return self.activation_fn(outputs)
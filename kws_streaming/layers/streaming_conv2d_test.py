@@ -0,0 +1,132 @@
+# coding=utf-8
+# Copyright 2020 The Google Research Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for kws_streaming.layers.streaming_conv2d."""
+
+from absl.testing import parameterized
+import numpy as np
+from kws_streaming.layers import modes
+from kws_streaming.layers import streaming_conv2d
+from kws_streaming.layers import test_utils
+from kws_streaming.layers.compat import tf
+from kws_streaming.layers.compat import tf1
+from kws_streaming.models import utils
+tf1.disable_eager_execution()
+
+
+class StreamingConv2DTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super(StreamingConv2DTest, self).setUp()
+    test_utils.set_seed(123)
+
+  @parameterized.parameters(
+      ((3, 3), (1, 1)),
+      ((3, 2), (2, 1)),
+  )
+  def test_streaming_vs_non_streaming(self, kernel_size, dilation_rate):
+    time_size = 10
+    feature_size = 5
+    channel_size = 2
+    filters = 3
+    batch_size = 1
+
+    inputs = tf.keras.layers.Input(
+        shape=(time_size, feature_size, channel_size),
+        batch_size=batch_size,
+        name='inp_sequence')
+
+    # with causal padding streaming output matches non streaming one,
+    # because zeros in the initial streaming state
+    # emulate the zero padding in time
+    outputs = streaming_conv2d.StreamingConv2D(
+        filters=filters,
+        kernel_size=kernel_size,
+        dilation_rate=dilation_rate,
+        activation='relu',
+        mode=modes.Modes.TRAINING,
+        pad_time_dim='causal')(inputs)
+    model_train = tf.keras.Model(inputs, outputs)
+    model_train.summary()
+
+    # input test data
+    non_stream_input = np.random.rand(batch_size, time_size, feature_size,
+                                      channel_size).astype(np.float32)
+    non_stream_out = model_train.predict(non_stream_input)
+
+    # convert to streaming mode with external state
+    mode = modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE
+    input_tensors = [
+        tf.keras.layers.Input(
+            shape=(1, feature_size, channel_size),
+            batch_size=batch_size,
+            name='inp_stream')
+    ]
+    model_stream = utils.convert_to_inference_model(model_train, input_tensors,
+                                                    mode)
+    model_stream.summary()
+
+    # second input to stream model is a state, so we can use its shape
+    input_state_np = np.zeros(model_stream.inputs[1].shape, dtype=np.float32)
+
+    # run streaming inference and compare it with non streaming one
+    for i in range(time_size):
+      input_stream_np = non_stream_input[:, i:i + 1]
+      output_stream_np, output_state_np = model_stream.predict(
+          [input_stream_np, input_state_np])
+      input_state_np = output_state_np  # update input state
+      self.assertAllClose(output_stream_np[:, 0], non_stream_out[:, i])
+
+  def test_streaming_internal_state(self):
+    time_size = 8
+    feature_size = 4
+    channel_size = 1
+    filters = 2
+    batch_size = 1
+
+    inputs = tf.keras.layers.Input(
+        shape=(time_size, feature_size, channel_size),
+        batch_size=batch_size,
+        name='inp_sequence')
+    outputs = streaming_conv2d.StreamingConv2D(
+        filters=filters,
+        kernel_size=(3, 3),
+        mode=modes.Modes.TRAINING,
+        pad_time_dim='causal')(inputs)
+    model_train = tf.keras.Model(inputs, outputs)
+
+    non_stream_input = np.random.rand(batch_size, time_size, feature_size,
+                                      channel_size).astype(np.float32)
+    non_stream_out = model_train.predict(non_stream_input)
+
+    # convert to streaming mode with internal state
+    mode = modes.Modes.STREAM_INTERNAL_STATE_INFERENCE
+    input_tensors = [
+        tf.keras.layers.Input(
+            shape=(1, feature_size, channel_size),
+            batch_size=batch_size,
+            name='inp_stream')
+    ]
+    model_stream = utils.convert_to_inference_model(model_train, input_tensors,
+                                                    mode)
+
+    # run streaming inference and compare it with non streaming one
+    for i in range(time_size):
+      output_stream_np = model_stream.predict(non_stream_input[:, i:i + 1])
+      self.assertAllClose(output_stream_np[:, 0], non_stream_out[:, i])
+
+
+if __name__ == '__main__':
+  tf.test.main()
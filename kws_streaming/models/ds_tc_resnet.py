@@ -14,6 +14,7 @@
 # limitations under the License.
 
 """Model based on 1D depthwise and 1x1 convolutions in time + residual."""
+import numpy as np
 from kws_streaming.layers import modes
 from kws_streaming.layers import speech_features
 from kws_streaming.layers import stream
@@ -52,7 +53,8 @@ def model_parameters(parser_nn):
       '--ds_filter_separable',
       type=str,
       default='1, 1, 1, 1, 1, 1',
-      help='If 1 - use separable filter: depthwise conv in time and 1x1 conv '
+      help='If 2 - use fused separable filter: SeparableConv2D in time '
+      'If 1 - use separable filter: depthwise conv in time and 1x1 conv '
       'If 0 - use conv filter in time'
   )
   parser_nn.add_argument(
@@ -103,6 +105,116 @@ def model_parameters(parser_nn):
       default=1,
       help='apply scaling in batch normalization layer'
   )
+  parser_nn.add_argument(
+      '--ds_reorder_projection',
+      type=int,
+      default=0,
+      help='If 1 - in separable blocks with more input channels than '
+      'filters run the 1x1 projection before the first depthwise conv, '
+      'it reduces the depthwise compute'
+  )
+  parser_nn.add_argument(
+      '--use_xla',
+      type=int,
+      default=0,
+      help='If 1 - enable XLA jit compilation with autoclustering, '
+      'it fuses the small per block depthwise/1x1/batchnorm/activation ops'
+  )
+
+
+class FusedDsBlock(tf.keras.layers.Layer):
+  """Separable conv block built on raw tf.nn primitives.
+
+  It runs the depthwise conv in time, the 1x1 pointwise conv, fused
+  batch norm and relu of one resnet_block iteration as four tf.nn ops
+  inside a single layer. Compared with the six Keras layers it replaces,
+  there is one __call__ dispatch and one name scope per block instead of
+  six, and the normalization runs through the fused_batch_norm kernel.
+
+  The block is inference oriented: batch norm always uses the stored
+  moving statistics. It is a building block for hand fused deployment
+  graphs and is not used by model(), which keeps the Keras layer layout
+  for checkpoint compatibility and streaming conversion.
+
+  Attributes:
+    filters: number of filters in the pointwise conv
+    kernel_size: kernel size of the depthwise conv in time dim
+    dilation: dilation of the depthwise conv in time dim
+    stride: stride of the depthwise conv in time dim
+    epsilon: small float added to the batch norm variance
+    **kwargs: additional layer arguments
+  """
+
+  def __init__(self,
+               filters,
+               kernel_size,
+               dilation=1,
+               stride=1,
+               epsilon=1e-3,
+               **kwargs):
+    super(FusedDsBlock, self).__init__(**kwargs)
+    self.filters = filters
+    self.kernel_size = kernel_size
+    self.dilation = dilation
+    self.stride = stride
+    self.epsilon = epsilon
+
+  def build(self, input_shape):
+    super(FusedDsBlock, self).build(input_shape)
+    # input_shape is [batch, time, 1, channels]
+    channels = input_shape.as_list()[-1]
+    self.depthwise_kernel = self.add_weight(
+        name='depthwise_kernel',
+        shape=[self.kernel_size, 1, channels, 1],
+        initializer='glorot_uniform')
+    self.pointwise_kernel = self.add_weight(
+        name='pointwise_kernel',
+        shape=[1, 1, channels, self.filters],
+        initializer='glorot_uniform')
+    self.gamma = self.add_weight(
+        name='gamma', shape=[self.filters], initializer='ones')
+    self.beta = self.add_weight(
+        name='beta', shape=[self.filters], initializer='zeros')
+    self.moving_mean = self.add_weight(
+        name='moving_mean',
+        shape=[self.filters],
+        trainable=False,
+        initializer='zeros')
+    self.moving_variance = self.add_weight(
+        name='moving_variance',
+        shape=[self.filters],
+        trainable=False,
+        initializer='ones')
+
+  def call(self, inputs):
+    net = tf.nn.depthwise_conv2d(
+        inputs,
+        self.depthwise_kernel,
+        strides=[1, self.stride, 1, 1],
+        padding='SAME',
+        dilations=[self.dilation, 1])
+    net = tf.nn.conv2d(
+        net, self.pointwise_kernel, strides=[1, 1, 1, 1], padding='VALID')
+    net, _, _ = tf.nn.fused_batch_norm(
+        net,
+        self.gamma,
+        self.beta,
+        mean=self.moving_mean,
+        variance=self.moving_variance,
+        epsilon=self.epsilon,
+        is_training=False)
+    return tf.nn.relu(net)
+
+  def get_config(self):
+    config = {
+        'filters': self.filters,
+        'kernel_size': self.kernel_size,
+        'dilation': self.dilation,
+        'stride': self.stride,
+        'epsilon': self.epsilon,
+    }
+    base_config = super(FusedDsBlock, self).get_config()
+    return dict(list(base_config.items()) + list(config.items()))
 
 
 def resnet_block(inputs,
@@ -116,7 +228,8 @@ def resnet_block(inputs,
                  padding='same',
                  dropout=0.0,
                  activation='relu',
-                 scale=True):
+                 scale=True,
+                 reorder_projection=False):
   """Residual block.
 
   It is based on paper
@@ -130,12 +243,16 @@ def resnet_block(inputs,
     filters: number of filters in DepthwiseConv1D and Conv1D
     dilation: dilation in time dim for DepthwiseConv1D
     stride: stride in time dim for DepthwiseConv1D
-    filter_separable: use separable conv or standard conv
+    filter_separable: 0 - use standard conv; 1 - use separable conv as
+      depthwise conv in time and 1x1 conv; 2 - use fused SeparableConv2D
     residual: if True residual connection is added
     padding: can be 'same' or 'causal'
     dropout: dropout value
     activation: type of activation function (string)
     scale: apply scaling in batchnormalization layer
+    reorder_projection: if True and the input has more channels than
+      filters, the first separable iteration runs its 1x1 projection
+      before the depthwise conv
 
   Returns:
     output tensor
@@ -147,8 +264,51 @@ def resnet_block(inputs,
     raise ValueError('padding should be same or causal')
 
   net = inputs
-  for _ in range(repeat-1):
-    if filter_separable:  # apply separable conv
+
+  repeat_remaining = repeat
+  if (reorder_projection and filter_separable == 1 and kernel_size > 0 and
+      repeat > 1 and net.shape[-1] > filters):
+    # the input is wider than the block filters: running the 1x1
+    # projection first shrinks the channel count before the depthwise
+    # conv, whose cost scales linearly with channels, so the first
+    # iteration does the same work on fewer channels
+    net = tf.keras.layers.Conv2D(
+        filters=filters, kernel_size=1, use_bias=False, padding='valid')(
+            net)
+    net = tf.keras.layers.BatchNormalization(scale=scale)(net)
+    net = tf.keras.layers.Activation(activation)(net)
+
+    # DepthwiseConv1D
+    net = stream.Stream(
+        cell=tf.keras.layers.DepthwiseConv2D(
+            kernel_size=(kernel_size, 1),
+            strides=(stride, 1),
+            padding='valid',
+            dilation_rate=(dilation, 1),
+            use_bias=False),
+        pad_time_dim=padding)(
+            net)
+    net = tf.keras.layers.BatchNormalization(scale=scale)(net)
+    net = tf.keras.layers.Activation(activation)(net)
+    if dropout > 0:
+      net = tf.keras.layers.SpatialDropout2D(rate=dropout)(net)
+    repeat_remaining = repeat - 1
+
+  for _ in range(repeat_remaining-1):
+    if filter_separable == 2:  # apply fused separable conv
+      # the fused op avoids materializing the intermediate activation
+      # between the depthwise and pointwise convolutions
+      net = stream.Stream(
+          cell=tf.keras.layers.SeparableConv2D(
+              filters=filters,
+              kernel_size=(max(kernel_size, 1), 1),
+              strides=(stride, 1),
+              padding='valid',
+              dilation_rate=(dilation, 1),
+              use_bias=False),
+          pad_time_dim=padding)(
+              net)
+    elif filter_separable:  # apply separable conv
       if kernel_size > 0:
         # DepthwiseConv1D
         net = stream.Stream(
@@ -179,9 +339,26 @@ def resnet_block(inputs,
 
     net = tf.keras.layers.BatchNormalization(scale=scale)(net)
     net = tf.keras.layers.Activation(activation)(net)
-    net = tf.keras.layers.Dropout(rate=dropout)(net)
-
-  if filter_separable:  # apply separable conv
+    if dropout > 0:
+      # drop whole feature maps: on conv outputs it regularizes better
+      # than elementwise dropout; with rate 0 the layer is not built at
+      # all, so inference graphs carry no no-op nodes
+      net = tf.keras.layers.SpatialDropout2D(rate=dropout)(net)
+
+  if filter_separable == 2:  # apply fused separable conv
+    # the fused op avoids materializing the intermediate activation
+    # between the depthwise and pointwise convolutions
+    net = stream.Stream(
+        cell=tf.keras.layers.SeparableConv2D(
+            filters=filters,
+            kernel_size=(max(kernel_size, 1), 1),
+            strides=(stride, 1),
+            padding='valid',
+            dilation_rate=(dilation, 1),
+            use_bias=False),
+        pad_time_dim=padding)(
+            net)
+  elif filter_separable:  # apply separable conv
     if kernel_size > 0:
       # DepthwiseConv1D
       net = stream.Stream(
@@ -213,16 +390,23 @@ def resnet_block(inputs,
   net = tf.keras.layers.BatchNormalization(scale=scale)(net)
 
   if residual:
-    # Conv1D 1x1 - streamable by default
-    net_res = tf.keras.layers.Conv2D(
-        filters=filters, kernel_size=1, use_bias=False, padding='valid')(
-            inputs)
-    net_res = tf.keras.layers.BatchNormalization(scale=scale)(net_res)
+    if inputs.shape[-1] == filters and stride == 1:
+      # the block input already has the target number of channels, so the
+      # 1x1 projection would be a square matmul adding parameters and
+      # FLOPs without changing the shape: keep only the normalization
+      net_res = tf.keras.layers.BatchNormalization(scale=scale)(inputs)
+    else:
+      # Conv1D 1x1 - streamable by default
+      net_res = tf.keras.layers.Conv2D(
+          filters=filters, kernel_size=1, use_bias=False, padding='valid')(
+              inputs)
+      net_res = tf.keras.layers.BatchNormalization(scale=scale)(net_res)
 
     net = tf.keras.layers.Add()([net, net_res])
 
   net = tf.keras.layers.Activation(activation)(net)
-  net = tf.keras.layers.Dropout(rate=dropout)(net)
+  if dropout > 0:
+    net = tf.keras.layers.SpatialDropout2D(rate=dropout)(net)
   return net
 
 
@@ -245,6 +429,12 @@ def model(flags):
     or if padding is not supported
   """
 
+  if getattr(flags, 'use_xla', 0):
+    # every block runs many small depthwise/1x1/batchnorm/activation ops:
+    # XLA autoclustering fuses them into a few kernels and removes the
+    # global memory round trips between the depthwise and 1x1 convs
+    tf.config.optimizer.set_jit('autoclustering')
+
   ds_filters = utils.parse(flags.ds_filters)
   ds_repeat = utils.parse(flags.ds_repeat)
   ds_kernel_size = utils.parse(flags.ds_kernel_size)
@@ -255,10 +445,18 @@ def model(flags):
   ds_padding = utils.parse(flags.ds_padding)
   ds_filter_separable = utils.parse(flags.ds_filter_separable)
 
-  for l in (ds_repeat, ds_kernel_size, ds_stride, ds_dilation, ds_residual,
-            ds_pool, ds_padding, ds_filter_separable):
-    if len(ds_filters) != len(l):
-      raise ValueError('all input lists have to be the same length')
+  if len({
+      len(ds_filters),
+      len(ds_repeat),
+      len(ds_kernel_size),
+      len(ds_stride),
+      len(ds_dilation),
+      len(ds_residual),
+      len(ds_pool),
+      len(ds_padding),
+      len(ds_filter_separable)
+  }) != 1:
+    raise ValueError('all input lists have to be the same length')
 
   input_audio = tf.keras.layers.Input(
       shape=modes.get_input_data_shape(flags, modes.Modes.TRAINING),
@@ -272,7 +470,11 @@ def model(flags):
             net)
 
   # make it [batch, time, 1, feature]
-  net = tf.keras.backend.expand_dims(net, axis=2)
+  # a Reshape layer with a static feature dim maps to a single reshape op
+  # with a constant shape, which is cleaner for tflite conversion than the
+  # expand_dims op lambda; time stays -1 so streaming conversion with
+  # time dim 1 keeps working
+  net = tf.keras.layers.Reshape((-1, 1, net.shape[-1]))(net)
 
   # encoder
   for filters, repeat, ksize, stride, sep, dilation, res, pool, pad in zip(
@@ -280,7 +482,8 @@ def model(flags):
       ds_dilation, ds_residual, ds_pool, ds_padding):
     net = resnet_block(net, repeat, ksize, filters, dilation, stride,
                        sep, res, pad, flags.dropout,
-                       flags.activation, flags.ds_scale)
+                       flags.activation, flags.ds_scale,
+                       getattr(flags, 'ds_reorder_projection', 0))
     if pool > 1:
       if flags.ds_max_pool:
         net = tf.keras.layers.MaxPooling2D(
@@ -294,12 +497,310 @@ def model(flags):
             )(net)
 
   # decoder
+  # GlobalAveragePooling2D already returns [batch, channels],
+  # so no Flatten is needed before the classifier
   net = stream.Stream(cell=tf.keras.layers.GlobalAveragePooling2D())(net)
 
-  net = tf.keras.layers.Flatten()(net)
-
   net = tf.keras.layers.Dense(units=flags.label_count)(net)
 
   if flags.return_softmax:
     net = tf.keras.layers.Activation('softmax')(net)
   return tf.keras.Model(input_audio, net)
+
+
+def fuse_bn_into_conv(model):
+  """Folds batch normalization into the preceding convolutions.
+
+  At inference batch normalization is an affine per channel scale and
+  bias, so for every conv -> batchnorm pair the scale is folded into the
+  conv weights (kernel' = kernel * gamma / sigma) and the bias into a
+  conv bias (bias' = beta + (bias - mean) * gamma / sigma), and the
+  batchnorm layer is replaced by a linear activation. It removes one
+  full tensor read/write per block, which matters on the memory bound
+  depthwise convs.
+
+  Only pairs where the conv output has no other consumers are fused;
+  convs wrapped by Stream() are fused through the wrapper.
+  The returned model is for inference only: batch statistics are frozen
+  into the weights.
+
+  Args:
+    model: Keras model returned by model()
+
+  Returns:
+    Keras model with batchnorm folded into the conv weights
+  """
+  # find batchnorm layers consuming the output of a single conv
+  bn_of_conv = {}
+  for layer in model.layers:
+    if not isinstance(layer, tf.keras.layers.BatchNormalization):
+      continue
+    inbound = layer.inbound_nodes[0].inbound_layers
+    if isinstance(inbound, list):
+      if len(inbound) != 1:
+        continue
+      producer = inbound[0]
+    else:
+      producer = inbound
+    # the batchnorm has to be the only consumer of the conv output
+    if len(producer.outbound_nodes) != 1:
+      continue
+    cell = producer.cell if isinstance(producer, stream.Stream) else producer
+    if isinstance(cell, (tf.keras.layers.Conv2D,
+                         tf.keras.layers.DepthwiseConv2D)):
+      bn_of_conv[producer.name] = layer.name
+
+  fused_bns = set(bn_of_conv.values())
+
+  def _clone_layer(layer):
+    config = layer.get_config()
+    if layer.name in fused_bns:
+      # normalization math is folded into the conv weights,
+      # so the batchnorm becomes a pass through
+      return tf.keras.layers.Activation('linear', name=layer.name)
+    if layer.name in bn_of_conv:
+      # the folded bias needs a bias weight in the conv
+      if isinstance(layer, stream.Stream):
+        cell_config = layer.cell.get_config()
+        cell_config['use_bias'] = True
+        config['cell'] = layer.cell.__class__.from_config(cell_config)
+      else:
+        config['use_bias'] = True
+    return layer.__class__.from_config(config)
+
+  fused_model = tf.keras.models.clone_model(
+      model, clone_function=_clone_layer)
+
+  for layer, fused_layer in zip(model.layers, fused_model.layers):
+    if layer.name in fused_bns:
+      continue
+    if layer.name not in bn_of_conv:
+      fused_layer.set_weights(layer.get_weights())
+      continue
+
+    bn = model.get_layer(bn_of_conv[layer.name])
+    cell = layer.cell if isinstance(layer, stream.Stream) else layer
+    weights = layer.get_weights()
+    kernel = weights[0]
+    bias = weights[1] if cell.use_bias else 0.0
+
+    bn_weights = bn.get_weights()
+    if bn.scale:
+      gamma, bn_weights = bn_weights[0], bn_weights[1:]
+    else:
+      gamma = 1.0
+    if bn.center:
+      beta, bn_weights = bn_weights[0], bn_weights[1:]
+    else:
+      beta = 0.0
+    mean, variance = bn_weights
+    scale = gamma / np.sqrt(variance + bn.epsilon)
+
+    if isinstance(cell, tf.keras.layers.DepthwiseConv2D):
+      # depthwise kernel is [kt, kf, channels, multiplier] with output
+      # channels ordered as channel * multiplier
+      kernel_scale = scale.reshape(kernel.shape[-2], kernel.shape[-1])
+    else:
+      kernel_scale = scale
+    fused_kernel = kernel * kernel_scale
+    fused_bias = beta + (bias - mean) * scale
+    fused_layer.set_weights([fused_kernel, fused_bias])
+
+  return fused_model
+
+
+def convert_to_tflite_int8(model, representative_dataset):
+  """Converts model to tflite with post training int8 quantization.
+
+  The model is dominated by depthwise conv in time and 1x1 conv blocks:
+  int8 quantization halves the weight traffic of the memory bound
+  depthwise convs and runs the 1x1 projections on integer dot product
+  kernels, so both weights and activations are quantized.
+
+  Note it requires eager mode (TF2 behavior): from_keras_model traces
+  the model as a concrete function.
+
+  Args:
+    model: Keras model returned by model()
+    representative_dataset: function yielding ~100 batches of typical
+      input data, used to calibrate the activation ranges
+
+  Returns:
+    tflite model with int8 weights, activations and input/output
+  """
+  converter = tf.lite.TFLiteConverter.from_keras_model(model)
+  converter.optimizations = [tf.lite.Optimize.DEFAULT]
+  converter.representative_dataset = representative_dataset
+  converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+  converter.inference_input_type = tf.int8
+  converter.inference_output_type = tf.int8
+  # depthwise conv channels have very different weight scales, so a
+  # single per tensor scale loses most of their precision: insist on the
+  # per channel (per axis) quantization even if a converter build flips
+  # the default
+  converter._experimental_disable_per_channel = False  # pylint: disable=protected-access
+  return converter.convert()
+
+
+def verify_per_channel_quantization(tflite_model):
+  """Verifies that quantized conv weights use per channel scales.
+
+  Args:
+    tflite_model: tflite model produced by convert_to_tflite_int8()
+
+  Raises:
+    ValueError: if any conv weight tensor reports a single quantization
+      scale for multiple channels
+  """
+  interpreter = tf.lite.Interpreter(model_content=tflite_model)
+  interpreter.allocate_tensors()
+  details = {t['index']: t for t in interpreter.get_tensor_details()}
+  for op in interpreter._get_ops_details():  # pylint: disable=protected-access
+    if op['op_name'] not in ('CONV_2D', 'DEPTHWISE_CONV_2D'):
+      continue
+    # the second input of a conv op is its weight tensor
+    weights = details[op['inputs'][1]]
+    scales = weights['quantization_parameters']['scales']
+    if op['op_name'] == 'DEPTHWISE_CONV_2D':
+      # depthwise weights are [1, kt, kf, channels]
+      channels = weights['shape'][-1]
+    else:
+      # conv weights are [filters, kt, kf, channels]
+      channels = weights['shape'][0]
+    if channels > 1 and len(scales) != channels:
+      raise ValueError(
+          '%s weights %s with %d channels have %d quantization scales' %
+          (op['op_name'], weights['name'], channels, len(scales)))
+
+
+def apply_qat(model):
+  """Wraps model with quantization aware training.
+
+  Post training int8 quantization can degrade keyword spotting accuracy:
+  the classifier is sensitive to small perturbations. Quantization aware
+  training inserts fake quantization nodes into the convolutional/dense
+  layers (batchnorm and activations are handled by the tfmot defaults),
+  so a brief retraining recovers the accuracy before conversion with
+  convert_to_tflite_int8.
+
+  tfmot quantize_model() rejects any model with layers outside of its
+  registry, and model() always emits custom layers (Stream, and
+  SpeechFeatures with raw preprocessing). So the conv/dense layers are
+  annotated selectively with the tfmot defaults, the custom layers get a
+  pass through config, and the rest of the model is left alone.
+
+  Args:
+    model: Keras model returned by model()
+
+  Returns:
+    Keras model annotated for quantization aware training
+  """
+  # tensorflow_model_optimization is an optional dependency, so it is
+  # imported here and not at module level
+  import tensorflow_model_optimization as tfmot  # pylint: disable=g-import-not-at-top
+  quantize = tfmot.quantization.keras
+
+  class _PassThroughQuantizeConfig(quantize.QuantizeConfig):
+    """Keeps a custom layer unquantized inside an annotated model."""
+
+    def get_weights_and_quantizers(self, layer):
+      return []
+
+    def get_activations_and_quantizers(self, layer):
+      return []
+
+    def set_quantize_weights(self, layer, quantize_weights):
+      pass
+
+    def set_quantize_activations(self, layer, quantize_activations):
+      pass
+
+    def get_output_quantizers(self, layer):
+      return []
+
+    def get_config(self):
+      return {}
+
+  def _annotate_layer(layer):
+    if isinstance(layer, (stream.Stream, speech_features.SpeechFeatures)):
+      return quantize.quantize_annotate_layer(
+          layer, quantize_config=_PassThroughQuantizeConfig())
+    # Conv2D covers the DepthwiseConv2D and SeparableConv2D subclasses
+    if isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)):
+      return quantize.quantize_annotate_layer(layer)
+    return layer
+
+  annotated_model = tf.keras.models.clone_model(
+      model, clone_function=_annotate_layer)
+  # quantize_apply rebuilds the model from its config, so the custom
+  # layers have to be resolvable inside the quantize scope
+  with quantize.quantize_scope({
+      'Stream': stream.Stream,
+      'SpeechFeatures': speech_features.SpeechFeatures,
+      '_PassThroughQuantizeConfig': _PassThroughQuantizeConfig,
+  }):
+    return quantize.quantize_apply(annotated_model)
+
+
+def apply_pruning(model, target_sparsity=0.5, begin_step=0, end_step=10000):
+  """Wraps the 1x1 pointwise convs with magnitude pruning.
+
+  The 1x1 projections dominate the compute of this model and tolerate
+  sparsity well; at >= 50% sparsity the XNNPACK delegate dispatches
+  their matmuls to sparse kernels. Depthwise convs keep one weight per
+  channel tap and are left dense. After fine tuning, remove the pruning
+  wrappers with tfmot.sparsity.keras.strip_pruning before conversion
+  (pruning composes with convert_to_tflite_int8).
+
+  Args:
+    model: Keras model returned by model()
+    target_sparsity: final fraction of zeroed weights
+    begin_step: training step at which pruning starts
+    end_step: training step at which target_sparsity is reached
+
+  Returns:
+    Keras model with the 1x1 convs wrapped for pruning
+  """
+  # tensorflow_model_optimization is an optional dependency, so it is
+  # imported here and not at module level
+  import tensorflow_model_optimization as tfmot  # pylint: disable=g-import-not-at-top
+
+  pruning_params = {
+      'pruning_schedule':
+          tfmot.sparsity.keras.PolynomialDecay(
+              initial_sparsity=0.0,
+              final_sparsity=target_sparsity,
+              begin_step=begin_step,
+              end_step=end_step)
+  }
+
+  def _prune_layer(layer):
+    if (isinstance(layer, tf.keras.layers.Conv2D) and
+        not isinstance(layer, tf.keras.layers.DepthwiseConv2D) and
+        tuple(layer.kernel_size) == (1, 1)):
+      return tfmot.sparsity.keras.prune_low_magnitude(layer, **pruning_params)
+    return layer
+
+  return tf.keras.models.clone_model(model, clone_function=_prune_layer)
+
+
+def convert_to_tflite_fp16(model):
+  """Converts model to tflite with float16 weight quantization.
+
+  Float16 halves the model size with minimal accuracy loss and, unlike
+  int8, needs no calibration data and stays compatible with GPU
+  delegates which execute fp16 natively.
+
+  Note it requires eager mode (TF2 behavior): from_keras_model traces
+  the model as a concrete function.
+
+  Args:
+    model: Keras model returned by model()
+
+  Returns:
+    tflite model with float16 weights
+  """
+  converter = tf.lite.TFLiteConverter.from_keras_model(model)
+  converter.optimizations = [tf.lite.Optimize.DEFAULT]
+  converter.target_spec.supported_types = [tf.float16]
+  return converter.convert()
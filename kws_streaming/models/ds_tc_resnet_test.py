@@ -0,0 +1,198 @@
+# coding=utf-8
+# Copyright 2020 The Google Research Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for kws_streaming.models.ds_tc_resnet."""
+
+from absl.testing import parameterized
+import numpy as np
+from kws_streaming.layers import modes
+from kws_streaming.layers import test_utils
+from kws_streaming.layers.compat import tf
+from kws_streaming.models import ds_tc_resnet
+from kws_streaming.models import model_flags
+from kws_streaming.models import model_params
+from kws_streaming.models import utils
+
+
+def _model_params():
+  """Returns toy ds_tc_resnet parameters on mfcc features."""
+  params = model_params.HOTWORD_MODEL_PARAMS['ds_tc_resnet']
+  params.clip_duration_ms = 100
+  params.preprocess = 'mfcc'
+  params.batch_size = 1
+  return model_flags.update_flags(params)
+
+
+class DsTcResnetTest(tf.test.TestCase, parameterized.TestCase):
+  """Tests running in eager mode.
+
+  The tflite and tfmot helpers under test trace the model with TF2
+  behavior (from_keras_model, quantize_apply), so unlike utils_test
+  these tests do not disable eager execution.
+  """
+
+  def setUp(self):
+    super(DsTcResnetTest, self).setUp()
+    test_utils.set_seed(123)
+
+  def test_apply_qat(self):
+    params = _model_params()
+    model = ds_tc_resnet.model(params)
+    qat_model = ds_tc_resnet.apply_qat(model)
+    self.assertIsInstance(qat_model, tf.keras.Model)
+
+    # the annotated model has to stay runnable and keep the output shape
+    input_data = np.random.rand(params.batch_size, params.spectrogram_length,
+                                params.dct_num_features).astype(np.float32)
+    self.assertAllEqual(
+        qat_model.predict(input_data).shape,
+        model.predict(input_data).shape)
+
+  @parameterized.parameters(0, 1)
+  def test_fuse_bn_into_conv(self, ds_scale):
+    params = _model_params()
+    params.ds_scale = ds_scale
+    model = ds_tc_resnet.model(params)
+
+    # random batchnorm statistics, so folding them is not a no-op
+    for layer in model.layers:
+      if isinstance(layer, tf.keras.layers.BatchNormalization):
+        layer.set_weights([
+            np.random.uniform(0.5, 1.5, w.shape).astype(np.float32)
+            for w in layer.get_weights()
+        ])
+
+    fused_model = ds_tc_resnet.fuse_bn_into_conv(model)
+    # fused pairs trade 3-4 batchnorm weights for one conv bias
+    self.assertLess(len(fused_model.weights), len(model.weights))
+
+    input_data = np.random.rand(params.batch_size, params.spectrogram_length,
+                                params.dct_num_features).astype(np.float32)
+    self.assertAllClose(
+        fused_model.predict(input_data), model.predict(input_data), atol=1e-5)
+
+  def test_fused_ds_block_equivalence(self):
+    channels, filters, kernel_size = 4, 8, 3
+    inputs = np.random.rand(1, 10, 1, channels).astype(np.float32)
+
+    fused = ds_tc_resnet.FusedDsBlock(filters=filters, kernel_size=kernel_size)
+    fused.build(tf.TensorShape([1, 10, 1, channels]))
+    # random weights and batchnorm statistics shared with the reference
+    weights = [
+        np.random.uniform(-1.0, 1.0,
+                          (kernel_size, 1, channels, 1)),  # depthwise
+        np.random.uniform(-1.0, 1.0, (1, 1, channels, filters)),  # pointwise
+        np.random.uniform(0.5, 1.5, (filters,)),  # gamma
+        np.random.uniform(-0.5, 0.5, (filters,)),  # beta
+        np.random.uniform(-0.5, 0.5, (filters,)),  # moving mean
+        np.random.uniform(0.5, 1.5, (filters,)),  # moving variance
+    ]
+    weights = [w.astype(np.float32) for w in weights]
+    fused.set_weights(weights)
+
+    # the keras layer stack of one resnet_block iteration
+    net_input = tf.keras.layers.Input(shape=(10, 1, channels), batch_size=1)
+    net = tf.keras.layers.DepthwiseConv2D(
+        kernel_size=(kernel_size, 1), padding='same', use_bias=False)(
+            net_input)
+    net = tf.keras.layers.Conv2D(
+        filters=filters, kernel_size=1, use_bias=False, padding='valid')(
+            net)
+    net = tf.keras.layers.BatchNormalization()(net)
+    net = tf.keras.layers.Activation('relu')(net)
+    reference = tf.keras.Model(net_input, net)
+    # same weight layout: depthwise, pointwise, gamma, beta, mean, variance
+    reference.set_weights(weights)
+
+    self.assertAllClose(
+        fused(inputs).numpy(), reference.predict(inputs), atol=1e-5)
+
+  def test_model_to_tflite_stateful(self):
+    # model_to_tflite_stateful needs eager mode (from_keras_model), so
+    # it is covered here and not in utils_test; the causal toy model
+    # exercises the write index ring buffer states end to end through
+    # the resource variable scatter/gather ops
+    params = _model_params()
+    params.ds_padding = "'causal','causal'"
+    model = ds_tc_resnet.model(params)
+
+    tflite_model = utils.model_to_tflite_stateful(model, params)
+    self.assertTrue(tflite_model)
+
+    # reference: the same internal state streaming model run in keras
+    model_stream = utils.to_streaming_inference(
+        model, params, modes.Modes.STREAM_INTERNAL_STATE_INFERENCE)
+
+    interpreter = tf.lite.Interpreter(model_content=tflite_model)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()
+    output_details = interpreter.get_output_details()
+
+    input_data = np.random.rand(params.batch_size, params.spectrogram_length,
+                                params.dct_num_features).astype(np.float32)
+    for i in range(params.spectrogram_length):
+      frame = input_data[:, i:i + 1, :]
+      keras_output = model_stream.predict(frame)
+      interpreter.set_tensor(input_details[0]['index'], frame)
+      interpreter.invoke()
+      tflite_output = interpreter.get_tensor(output_details[0]['index'])
+      # the states have to advance identically on both sides, so every
+      # frame has to match, not only the last one
+      self.assertAllClose(tflite_output, keras_output, atol=1e-5)
+
+  def test_residual_identity_skip_has_no_projection(self):
+    # the block input already has the target number of channels and
+    # stride is 1, so the residual path is batchnorm only and must not
+    # allocate a square 1x1 projection kernel
+    inputs = tf.keras.layers.Input(shape=(7, 1, 8), batch_size=1)
+    net = ds_tc_resnet.resnet_block(
+        inputs, repeat=2, kernel_size=3, filters=8,
+        dilation=1, stride=1, filter_separable=1, residual=True)
+    model = tf.keras.Model(inputs, net)
+    pointwise_kernels = [
+        w for w in model.weights if w.shape.as_list()[:2] == [1, 1]]
+    # one 1x1 kernel per separable iteration and none on the skip path
+    self.assertLen(pointwise_kernels, 2)
+
+    # with a channel mismatch the skip path keeps the 1x1 projection
+    inputs = tf.keras.layers.Input(shape=(7, 1, 16), batch_size=1)
+    net = ds_tc_resnet.resnet_block(
+        inputs, repeat=2, kernel_size=3, filters=8,
+        dilation=1, stride=1, filter_separable=1, residual=True)
+    model = tf.keras.Model(inputs, net)
+    pointwise_kernels = [
+        w for w in model.weights if w.shape.as_list()[:2] == [1, 1]]
+    self.assertLen(pointwise_kernels, 3)
+
+  def test_convert_to_tflite_int8_per_channel(self):
+    params = _model_params()
+    model = ds_tc_resnet.model(params)
+    input_shape = (params.batch_size, params.spectrogram_length,
+                   params.dct_num_features)
+
+    def representative_dataset():
+      for _ in range(4):
+        yield [np.random.rand(*input_shape).astype(np.float32)]
+
+    tflite_model = ds_tc_resnet.convert_to_tflite_int8(
+        model, representative_dataset)
+    self.assertTrue(tflite_model)
+    # raises ValueError if any conv weight tensor (the depthwise convs
+    # are the sensitive ones) comes back with a single per tensor scale
+    ds_tc_resnet.verify_per_channel_quantization(tflite_model)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -103,9 +103,13 @@ def model(flags):
         speech_features.SpeechFeatures.get_params(flags))(
             net)
 
-  for units, return_sequences, num_proj in zip(
-      utils.parse(flags.lstm_units), utils.parse(flags.return_sequences),
-      utils.parse(flags.num_proj)):
+  lstm_units = utils.parse(flags.lstm_units)
+  lstm_return_sequences = utils.parse(flags.return_sequences)
+  lstm_num_proj = utils.parse(flags.num_proj)
+
+  for units, return_sequences, num_proj in zip(lstm_units,
+                                               lstm_return_sequences,
+                                               lstm_num_proj):
     net = lstm.LSTM(
         units=units,
         return_sequences=return_sequences,
@@ -117,11 +121,36 @@ def model(flags):
   net = stream.Stream(cell=tf.keras.layers.Flatten())(net)
   net = tf.keras.layers.Dropout(rate=flags.dropout1)(net)
 
-  for units, activation in zip(
-      utils.parse(flags.units1), utils.parse(flags.act1)):
+  units1 = utils.parse(flags.units1)
+  act1 = utils.parse(flags.act1)
+
+  for units, activation in zip(units1, act1):
     net = tf.keras.layers.Dense(units=units, activation=activation)(net)
 
   net = tf.keras.layers.Dense(units=flags.label_count)(net)
   if flags.return_softmax:
     net = tf.keras.layers.Activation('softmax')(net)
   return tf.keras.Model(input_audio, net)
+
+
+def convert_lstm_to_tflite_dynrange(model):
+  """Converts model to tflite with dynamic range quantization.
+
+  The model cost is dominated by the four large matmuls inside the
+  recurrent cell: dynamic range quantization stores their weights as
+  int8 and quantizes the matmul inputs on the fly, while activations
+  and states stay fp32. No calibration dataset is needed, unlike the
+  full integer recipe.
+
+  Note it requires eager mode (TF2 behavior): from_keras_model traces
+  the model as a concrete function.
+
+  Args:
+    model: Keras model returned by model()
+
+  Returns:
+    tflite model with int8 weights and fp32 activations
+  """
+  converter = tf.lite.TFLiteConverter.from_keras_model(model)
+  converter.optimizations = [tf.lite.Optimize.DEFAULT]
+  return converter.convert()
@@ -17,6 +17,7 @@
 """Utility functions for operations on Model."""
 
 import ast
+import functools
 import os.path
 from typing import Sequence
 
@@ -27,6 +28,7 @@ from kws_streaming.models import model_flags
 from kws_streaming.models import model_params
 from kws_streaming.models import models as kws_models
 # pylint: disable=g-direct-tensorflow-import
+from tensorflow.python.framework import convert_to_constants
 from tensorflow.python.keras import models
 from tensorflow.python.keras.engine import functional
 # pylint: enable=g-direct-tensorflow-import
@@ -312,7 +314,8 @@ def model_to_tflite(sess,
                     flags,
                     mode=modes.Modes.STREAM_EXTERNAL_STATE_INFERENCE,
                     save_model_path=None,
-                    optimizations=None):
+                    optimizations=None,
+                    representative_dataset=None):
   """Convert non streaming model to tflite inference model.
 
   In this case inference graph will be stateless.
@@ -327,6 +330,9 @@ def model_to_tflite(sess,
       streaming
     save_model_path: path to save intermediate model summary
     optimizations: list of optimization options
+    representative_dataset: function generating representative input data,
+      if set the model will be converted with post training int8 quantization
+      of both weights and activations
 
   Returns:
     tflite model
@@ -349,12 +355,61 @@ def model_to_tflite(sess,
   # this will enable audio_spectrogram and mfcc in TFLite
   converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
   converter.allow_custom_ops = True
+  if representative_dataset:
+    # post training quantization of weights and activations to int8:
+    # it halves the bytes moved per streaming step and enables integer
+    # dot product conv kernels
+    if not optimizations:
+      optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS_INT8
+    ]
   if optimizations:
     converter.optimizations = optimizations
   tflite_model = converter.convert()
   return tflite_model
 
 
+def model_to_tflite_stateful(model_non_stream, flags, save_model_path=None):
+  """Convert non streaming model to a stateful tflite inference model.
+
+  The model is converted in internal state streaming mode and the ring
+  buffer state variables are preserved as TFLite variables (VarHandle/
+  ReadVariable/AssignVariable ops) updated in place by the interpreter:
+  per frame inference then runs without any state tensors crossing the
+  interpreter boundary and without per frame state allocations.
+  Such model is dispatch bound rather than compute bound in TF, so
+  running it through the TFLite interpreter with the XNNPACK delegate
+  moves the per frame work into pre-compiled SIMD conv kernels.
+
+  Note it requires eager mode (TF2 behavior): from_keras_model traces
+  the model as a concrete function.
+
+  Args:
+    model_non_stream: Keras non streamable model
+    flags: settings with global data and model properties
+    save_model_path: path to save intermediate model summary
+
+  Returns:
+    tflite model
+  """
+  model_stream = to_streaming_inference(
+      model_non_stream, flags, modes.Modes.STREAM_INTERNAL_STATE_INFERENCE)
+
+  if save_model_path:
+    save_model_summary(model_stream, save_model_path)
+
+  converter = tf.lite.TFLiteConverter.from_keras_model(model_stream)
+  # keep the internal states as TFLite variables instead of folding or
+  # rejecting the resource ops
+  converter.experimental_enable_resource_variables = True
+  # this will enable audio_spectrogram and mfcc in TFLite
+  converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+  converter.allow_custom_ops = True
+  return converter.convert()
+
+
 # in below code .from_tensor() instead of tf.TensorSpec is adding TensorSpec
 # which is not recognized here, so making TensorSpec visible too
 TensorSpec = tf.TensorSpec
@@ -392,6 +447,142 @@ def model_to_saved(model_non_stream,
   model.save(save_model_path, include_optimizer=False, save_format='tf')
 
 
+def model_to_aot_artifacts(model,
+                           path,
+                           graph_file='frozen_graph.pb',
+                           config_file='tf2xla_config.pbtxt'):
+  """Exports a frozen graph and tf2xla config for tfcompile.
+
+  tfcompile compiles a fixed shape inference graph ahead of time into a
+  standalone object file: the deployment binary then runs the model with
+  no TF runtime and no per op dispatch, which fits a small streaming
+  model executed once per frame. This helper writes the two tfcompile
+  inputs, to be consumed as:
+    tfcompile --graph=frozen_graph.pb --config=tf2xla_config.pbtxt
+      --cpp_class=<namespace::ClassName>
+
+  Note it requires eager mode (TF2 behavior): the model is traced as a
+  concrete function before freezing.
+
+  Args:
+    model: Keras inference model with fully defined input shapes
+    path: directory where the exported files are stored
+    graph_file: file name of the frozen graph
+    config_file: file name of the tf2xla config
+
+  Returns:
+    tuple of paths of the written graph and config files
+  """
+  input_signature = [
+      tf.TensorSpec(tensor.shape, tensor.dtype) for tensor in model.inputs
+  ]
+
+  @tf.function(input_signature=input_signature)
+  def model_fn(*inputs):
+    return model(inputs[0] if len(inputs) == 1 else list(inputs),
+                 training=False)
+
+  concrete_function = model_fn.get_concrete_function()
+  frozen_function = convert_to_constants.convert_variables_to_constants_v2(
+      concrete_function)
+  tf.io.write_graph(
+      frozen_function.graph.as_graph_def(), path, graph_file, as_text=False)
+
+  # tf2xla config lists the graph feeds with their fixed shapes
+  # and the graph fetches
+  config_lines = []
+  for tensor in frozen_function.inputs:
+    dims = ''.join('dim { size: %d } ' % dim for dim in tensor.shape.as_list())
+    config_lines.append('feed {\n  id { node_name: "%s" }\n  shape { %s}\n}' %
+                        (tensor.name.split(':')[0], dims))
+  for tensor in frozen_function.outputs:
+    config_lines.append('fetch {\n  id { node_name: "%s" }\n}' %
+                        tensor.name.split(':')[0])
+
+  config_path = os.path.join(path, config_file)
+  with open(config_path, 'wt') as fd:
+    fd.write('\n'.join(config_lines) + '\n')
+  return os.path.join(path, graph_file), config_path
+
+
+def model_to_tf_function(model, jit_compile=True):
+  """Wraps an inference model into a tf.function, optionally XLA compiled.
+
+  A streaming inference model runs tens of small ops (roll, scatter, conv,
+  bias, activation, assign) per frame, each with its own dispatch and kernel
+  launch overhead. The streaming graph is fully shape static (batch 1, one
+  frame in time, fixed size states), which makes it an ideal XLA target:
+  with jit_compile XLA fuses the per frame ops into a few kernels.
+
+  Note it requires eager mode (TF2 behavior): with disabled eager execution
+  use the session runner and enable XLA autoclustering instead via
+  tf.config.optimizer.set_jit('autoclustering').
+
+  Args:
+    model: Keras inference model, for example produced by
+      to_streaming_inference()
+    jit_compile: if True the function is compiled with XLA
+
+  Returns:
+    tf.function with input signature of the model inputs,
+    returning the model outputs
+  """
+  input_signature = [
+      tf.TensorSpec(tensor.shape, tensor.dtype, name=tensor.name.split(':')[0])
+      for tensor in model.inputs
+  ]
+
+  @tf.function(input_signature=input_signature, jit_compile=jit_compile)
+  def model_fn(*inputs):
+    return model(inputs[0] if len(inputs) == 1 else list(inputs),
+                 training=False)
+
+  return model_fn
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_cached(text):
+  """Parses a literal string into a tuple of parameters."""
+  res = ast.literal_eval(text)
+  if isinstance(res, tuple):
+    return res
+  else:
+    return (res,)
+
+
+def model_to_saved_fixed_shape(model, save_model_path, batch_size=1):
+  """Saves model with a fixed shape serving signature.
+
+  The streaming deployment target runs the batch 1 hot path only, but a
+  model saved with a free batch dim keeps dynamic shape ops in the
+  graph. Tracing a concrete function with every input dim pinned lets
+  shape inference run statically over the whole graph, so the MLIR
+  converters drop the dynamic shape ops and XLA/TFLite fuse more. The
+  saved signature is the input shape for both the TFLite and the
+  tfcompile AOT paths.
+
+  Note it requires eager mode (TF2 behavior).
+
+  Args:
+    model: Keras inference model
+    save_model_path: path where saved model representation will be stored
+    batch_size: batch size pinned into the serving signature
+  """
+  input_signature = [
+      tf.TensorSpec([batch_size] + tensor.shape.as_list()[1:], tensor.dtype)
+      for tensor in model.inputs
+  ]
+
+  @tf.function
+  def model_fn(*inputs):
+    return model(inputs[0] if len(inputs) == 1 else list(inputs),
+                 training=False)
+
+  concrete_function = model_fn.get_concrete_function(*input_signature)
+  tf.saved_model.save(
+      model, save_model_path, signatures={'serving_default': concrete_function})
+
+
 def parse(text):
   """Parse model parameters.
 
@@ -403,11 +594,10 @@ def parse(text):
   """
   if not text:
     return []
-  res = ast.literal_eval(text)
-  if isinstance(res, tuple):
-    return res
-  else:
-    return [res]
+  # the same flag strings are parsed on every model build during sweeps,
+  # so the literal parsing is memoized; a fresh list is returned to keep
+  # callers free to mutate it
+  return list(_parse_cached(text))
 
 
 def next_power_of_two(x):
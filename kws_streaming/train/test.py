@@ -44,7 +44,7 @@ def run_stream_inference(flags, model_stream, inp_audio):
 
   while end <= inp_audio.shape[1]:
     stream_update = inp_audio[:, start:end]
-    stream_output_sample = model_stream.predict(stream_update)
+    stream_output_sample = model_stream.predict_on_batch(stream_update)
 
     if stream_out is None:
       stream_out = stream_output_sample
@@ -75,7 +75,7 @@ def run_stream_inference_classification(flags, model_stream, inp_audio):
     stream_update = inp_audio[:, start:end]
 
     # classification result of a current frame
-    stream_output_prediction = model_stream.predict(stream_update)
+    stream_output_prediction = model_stream.predict_on_batch(stream_update)
 
     # update indexes of streamed updates
     start = end
@@ -137,6 +137,44 @@ def run_stream_inference_classification_tflite(flags, interpreter, inp_audio,
   return out_tflite
 
 
+def run_batched_stream_inference(model_stream, stream_frames, input_states):
+  """Runs one external state streaming step for a batch of audio streams.
+
+  External state streaming keeps all states outside of the model, so N
+  concurrent audio streams can share one model call: their current frames
+  and states are stacked in the batch dim, one predict_on_batch serves all
+  of the streams and the updated states are split back per stream.
+  It amortizes the per call overhead over N streams and
+  keeps the per stream latency fixed.
+
+  The streaming model has to be converted with inference_batch_size equal
+  to the number of streams, so that its inputs and states have batch dim N.
+
+  Args:
+    model_stream: tf model in streaming mode with external state
+    stream_frames: list with the current input frame of every stream
+    input_states: list with the input states of every stream, where states
+      of one stream is a list of state arrays ordered as model inputs 1...
+  Returns:
+    tuple of output list and updated states list, both one entry per stream
+  """
+
+  batched_frames = np.concatenate(stream_frames, axis=0)
+  # for every state input stack the per stream states in the batch dim
+  batched_states = [
+      np.concatenate(states, axis=0) for states in zip(*input_states)
+  ]
+
+  outputs = model_stream.predict_on_batch([batched_frames] + batched_states)
+
+  # split outputs and updated states back per stream
+  batch_size = len(stream_frames)
+  stream_outputs = np.split(outputs[0], batch_size, axis=0)
+  split_states = [np.split(state, batch_size, axis=0) for state in outputs[1:]]
+  output_states = [list(states) for states in zip(*split_states)]
+  return stream_outputs, output_states
+
+
 def tf_non_stream_model_accuracy(
     flags,
     folder,
@@ -275,7 +313,7 @@ def tf_stream_state_internal_model_accuracy(
         stream_update = np.expand_dims(stream_update, axis=1)
 
         # classification result of a current frame
-        stream_output_prediction = model_stream.predict(stream_update)
+        stream_output_prediction = model_stream.predict_on_batch(stream_update)
         stream_output_arg = np.argmax(stream_output_prediction)
 
     total_accuracy = total_accuracy + (
@@ -385,7 +423,7 @@ def tf_stream_state_external_model_accuracy(
         inputs[0] = stream_update
 
         # run inference
-        outputs = model_stream.predict(inputs)
+        outputs = model_stream.predict_on_batch(inputs)
 
         # get output states and set it back to input states
         # which will be fed in the next inference cycle
@@ -406,7 +444,7 @@ def tf_stream_state_external_model_accuracy(
         inputs[0] = stream_update
 
         # run inference
-        outputs = model_stream.predict(inputs)
+        outputs = model_stream.predict_on_batch(inputs)
 
         # get output states and set it back to input states
         # which will be fed in the next inference cycle
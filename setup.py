@@ -12,6 +12,7 @@ setup(
     install_requires=[
         'absl-py>=0.7.0',
         'numpy>=1.13.3',
-        'tensorflow>=2.3.0', # was validated on tf_nightly-2.3.0.dev20200515-cp36-cp36m-manylinux2010_x86_64.whl
+        'tensorflow>=2.11.0', # TFLite int8 kernels on x86 are unoptimized in older releases
+        'tensorflow-model-optimization>=0.7.0', # QAT and pruning helpers
     ],
 )